@@ -280,6 +280,7 @@ def reload_settings():
         return
 
     globs.executor.bncache.settings = {}
+    globs.executor.reload_settings()
 
 triton_simplifier = None
 def synthesize_triton(expr):
@@ -157,7 +157,7 @@ def _async_toggle_state_history(bv):
     if globs.executor.state is None:
         return
 
-    if globs.executor.bncache.get_setting("save_state_history") == "false":
+    if not globs.executor.save_state_history:
         log_alert("State history is not saved. This can be changed in settings")
         return
 
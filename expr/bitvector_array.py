@@ -205,6 +205,7 @@ class BVArray(object):
         new._conc_store = deepcopy(self._conc_store)
         new._z3obj = self._z3obj
         new._assertions = dict(self._assertions)
+        new._mode = self._mode
         new.uninit_id = self.uninit_id
 
         return new
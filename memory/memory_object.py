@@ -29,6 +29,25 @@ class MemoryObj(object):
             # this can be inefficient
             self.bvarray.ConditionalStore(index, value, condition)
 
+    def load_word(self, index: BV, size: int, endness='big'):
+        # load "size" consecutive bytes starting from index
+        ran = range(size - 1, -1, -1) if endness == 'little' else range(size)
+        res = None
+        for i in ran:
+            tmp = self.bvarray.Select(index + i)
+            res = tmp if res is None else res.Concat(tmp)
+        return res
+
+    def store_word(self, index: BV, value: BV, endness='big', condition: Bool = None):
+        # store value in consecutive bytes starting from index
+        num_bytes = value.size // 8
+        for i in range(num_bytes):
+            offset = i if endness == 'little' else num_bytes - i - 1
+            self.store(
+                index + offset,
+                value.Extract(8*(i+1)-1, 8*i),
+                condition)
+
     def copy(self):
         return MemoryObj(self.name, self.bits, self.bvarray.copy())
 
@@ -75,8 +75,9 @@ class Regs(object):
     def merge(self, other, merge_condition: Bool):
         assert isinstance(other, Regs)
 
+        other_regs_data = other.state.arch.regs_data()
         for reg in self.state.arch.regs_data():
-            assert reg in other.state.arch.regs_data()
+            assert reg in other_regs_data
 
             self_reg = getattr(self, reg)
             other_reg = getattr(other, reg)
@@ -1,5 +1,3 @@
-import math
-
 from copy import deepcopy
 from .memory_abstract import MemoryAbstract
 from ..expr import BV, BVS
@@ -46,7 +44,7 @@ class MemoryConcreteFlat(MemoryAbstract):
         self.state = state
         self.pages = dict()
         self.page_size = page_size
-        self.index_bits = math.ceil(math.log(page_size, 2))
+        self.index_bits = (page_size - 1).bit_length()
 
     def __str__(self):
         return "<SymMemoryFlat, %d pages>" % len(self.pages)
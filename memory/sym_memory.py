@@ -1,15 +1,16 @@
-import math
-
+from bisect import bisect_left, bisect_right, insort
 from collections import namedtuple
 from ..utility.expr_wrap_util import symbolic, split_bv, heuristic_find_base
 from ..utility import exceptions
-from ..expr import BV, BVV, Bool, Or, ITE
+from ..expr import BV, BVV, Bool, And, Or, ITE
 from .memory_object import MemoryObj
 from .memory_abstract import MemoryAbstract
 
-# bytes: byte array; index: int
+# bytes: bytes-like object; index: int
 InitData = namedtuple('InitData', ['bytes', 'index'])
 
+COW_MAX_DEPTH = 16
+
 
 class Page(object):
     def __init__(self, addr: int, size: int = 0x1000, bits: int = 12, init: InitData = None):
@@ -19,39 +20,140 @@ class Page(object):
         self.dirty = False
         self.mo = MemoryObj("%Xh" % addr, bits)
         self._init = init
-        self._lazycopy = 0
+        # concrete indexes written while the init bytes are not in self.mo
+        self._written = set()
 
     def lazy_init(self):
+        # move the init bytes that were not overwritten in self.mo. Required
+        # by the accesses that cannot be served directly from the init bytes
+        # (symbolic index, conditional store, merge)
         if self._init is not None:
-            start = BVV(self._init.index, self.bits)
+            start = self._init.index
             val = self._init.bytes
-            assert len(val) + self._init.index <= self.size
+            assert len(val) + start <= self.size
             for i in range(len(val)):
-                subval = val[i]
-                self.mo.store(start + i, BVV(subval, 8))
+                if start + i not in self._written:
+                    self.mo.store(BVV(start + i, self.bits), BVV(val[i], 8))
             self._init = None
+            self._written = set()
+
+    def _init_byte(self, index: int):
+        # byte at index if it still comes from the init bytes, None otherwise
+        if self._init is None or index in self._written:
+            return None
+        i = index - self._init.index
+        if 0 <= i < len(self._init.bytes):
+            return self._init.bytes[i]
+        return None
 
     def store(self, index: BV, value: BV, condition: Bool = None):
         self.dirty = True
 
-        self.lazy_init()
-        if self._lazycopy > 0:
-            self._lazycopy -= 1
-            new_page = Page(self.addr, self.size, self.bits)
-            new_page.mo = self.mo.copy()
-            return new_page.store(index, value)
-
         index = index.simplify()
+        if isinstance(index, BVV) and condition is None:
+            if self._init is not None:
+                self._written.add(index.value)
+        else:
+            self.lazy_init()
         self.mo.store(index, value, condition)
-        return self
 
     def load(self, index: BV):
-        self.lazy_init()
+        if isinstance(index, BVV):
+            init_byte = self._init_byte(index.value)
+            if init_byte is not None:
+                return BVV(init_byte, 8)
+        else:
+            self.lazy_init()
         return self.mo.load(index)
 
-    def copy(self):
-        self._lazycopy += 1
-        return self
+    def store_word(self, index: BVV, value: BV, endness='big'):
+        self.dirty = True
+
+        if self._init is not None:
+            self._written.update(
+                range(index.value, index.value + value.size // 8))
+        self.mo.store_word(index, value, endness)
+
+    def load_word(self, index: BVV, size: int, endness='big'):
+        if self._init is None:
+            return self.mo.load_word(index, size, endness)
+
+        i = index.value - self._init.index
+        if (
+            0 <= i and i + size <= len(self._init.bytes) and
+            self._written.isdisjoint(range(index.value, index.value + size))
+        ):
+            # the whole word comes from the init bytes
+            return BVV(
+                int.from_bytes(self._init.bytes[i:i+size], endness),
+                size * 8)
+
+        ran = range(size - 1, -1, -1) if endness == 'little' else range(size)
+        res = None
+        for i in ran:
+            tmp = self.load(index + i)
+            res = tmp if res is None else res.Concat(tmp)
+        return res
+
+    def clone(self):
+        # the init bytes are read-only, they can be shared
+        new_page = Page(self.addr, self.size, self.bits, self._init)
+        new_page.dirty = self.dirty
+        new_page.mo = self.mo.copy()
+        new_page._written = set(self._written)
+        return new_page
+
+
+class CoWPages(object):
+    """ Copy-on-write dict of pages. The writes go in the overlay, the reads
+        fall back to the (shared and never modified) parent """
+
+    def __init__(self, parent=None, overlay: dict = None):
+        self._parent = parent
+        self._overlay = dict() if overlay is None else overlay
+        self.depth = 0 if parent is None else parent.depth + 1
+
+    def __getitem__(self, page_addr: int):
+        node = self
+        while node is not None:
+            if page_addr in node._overlay:
+                return node._overlay[page_addr]
+            node = node._parent
+        raise KeyError(page_addr)
+
+    def __setitem__(self, page_addr: int, page: Page):
+        self._overlay[page_addr] = page
+
+    def __contains__(self, page_addr: int):
+        node = self
+        while node is not None:
+            if page_addr in node._overlay:
+                return True
+            node = node._parent
+        return False
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def keys(self):
+        res = set()
+        node = self
+        while node is not None:
+            res |= node._overlay.keys()
+            node = node._parent
+        return res
+
+    def is_owned(self, page_addr: int):
+        # the page is not shared with the other copies
+        return page_addr in self._overlay
+
+    def flatten(self):
+        return CoWPages(overlay={
+            page_addr: self[page_addr] for page_addr in self.keys()
+        })
 
 
 class Memory(MemoryAbstract):
@@ -62,15 +164,29 @@ class Memory(MemoryAbstract):
         assert (page_size & (page_size - 1)) == 0
         self.bits = bits
         self.state = state
-        self.pages = dict()
+        self.pages = CoWPages()
+        # page addresses in ascending order, for range queries.
+        # Shared with the copies until the next mmap
+        self._page_addrs = list()
+        self._page_addrs_shared = False
         self.page_size = page_size
-        self.index_bits = math.ceil(math.log(page_size, 2))
+        self.index_bits = (page_size - 1).bit_length()
+        self._address_mask = (1 << bits) - 1
         self.symb_init = symb_uninitialized
+        # single-entry cache of the last accessed page
+        self._tlb_addr = None
+        self._tlb_page = None
+        self._tlb_owned = False
+        # last page below the previous allocation: where the next one is
+        # proposed before walking the gaps. The gaps above the hint are
+        # smaller than _alloc_max_gap pages
+        self._alloc_hint = None
+        self._alloc_max_gap = 0
         self.load_hooks = []
         self.store_hooks = []
 
     def __str__(self):
-        return "<SymMemory, %d pages>" % len(self.pages)
+        return "<SymMemory, %d pages>" % len(self._page_addrs)
 
     def __repr__(self):
         return self.__str__()
@@ -85,6 +201,7 @@ class Memory(MemoryAbstract):
         assert address % self.page_size == 0
         assert size % self.page_size == 0
 
+        self._invalidate_tlb()
         init_val = None
         init_index = None
         if init is not None:
@@ -105,6 +222,10 @@ class Memory(MemoryAbstract):
             data_index_i = 0
             data_index_f = self.page_size
 
+        if init_val is not None:
+            # the pages get slices of the very same buffer, without copies
+            init_val = memoryview(init_val)
+
         i = 0
         for a in range(
             address // self.page_size,
@@ -122,6 +243,10 @@ class Memory(MemoryAbstract):
                     data_index_f = data_index_i + self.page_size
                 self.pages[a] = Page(
                     a, self.page_size, self.index_bits, init_data)
+                if self._page_addrs_shared:
+                    self._page_addrs = list(self._page_addrs)
+                    self._page_addrs_shared = False
+                insort(self._page_addrs, a)
             else:
                 print("remapping the same page '%s'" % hex(a))
             i += 1
@@ -129,6 +254,22 @@ class Memory(MemoryAbstract):
     def is_mapped(self, address: int):
         return address >> self.index_bits in self.pages
 
+    def _mapped_pages_in_range(self, min_page: int, max_page: int):
+        return self._page_addrs[
+            bisect_left(self._page_addrs, min_page):
+            bisect_right(self._page_addrs, max_page)
+        ]
+
+    def _mapped_ranges(self, min_page: int, max_page: int):
+        # contiguous runs of mapped pages within [min_page, max_page]
+        res = list()
+        for p in self._mapped_pages_in_range(min_page, max_page):
+            if res and res[-1][1] == p - 1:
+                res[-1][1] = p
+            else:
+                res.append([p, p])
+        return res
+
     def _handle_symbolic_address(self, address: BV, size: int, op_type: str):
 
         if isinstance(address, BVV):
@@ -225,12 +366,11 @@ class Memory(MemoryAbstract):
                           (op_type, heuristic_base))
                     pivot = heuristic_base_page
                 else:
-                    # make it more efficient! (interval tree?)
-                    pages_in_range = [page for page in self.pages if (
-                        page >= min_addr_page and page <= max_addr_page)]
+                    pages_in_range = self._mapped_pages_in_range(
+                        min_addr_page, max_addr_page)
 
                     if pages_in_range:
-                        pivot = min(pages_in_range)
+                        pivot = pages_in_range[0]
                     else:
                         print(
                             "WARNING: memory %s, allocating pages (\"limit_pages\" policy)" % op_type)
@@ -254,13 +394,80 @@ class Memory(MemoryAbstract):
             max_addr_approx if max_addr is None else max_addr
         )
 
-    def _store(self, page_address: int, page_index: BV, value: BV, condition: Bool = None):
+    def _feasible_pages(self, page_address: BV, min_addr: int, max_addr: int):
+        # Enumerate the mapped pages that page_address can point to. Rather
+        # than asking the solver about every mapped page, we restrict
+        # page_address to the mapped pages in range and let the solver
+        # enumerate the models: the number of queries is proportional to
+        # the number of feasible pages, not to the number of mapped pages
+        ranges = self._mapped_ranges(
+            min_addr >> self.index_bits, max_addr >> self.index_bits)
+        if not ranges:
+            return list()
+
+        in_mapped = Or(*[
+            (page_address == low) if low == high else
+            And(page_address.UGE(low), page_address.ULE(high))
+            for low, high in ranges
+        ])
+        if not self.state.solver.satisfiable(extra_constraints=[in_mapped]):
+            return list()
+
+        num_candidates = sum(high - low + 1 for low, high in ranges)
+        return [
+            v.value for v in self.state.solver.evaluate_upto(
+                page_address, num_candidates, extra_constraints=[in_mapped])
+        ]
+
+    def _invalidate_tlb(self):
+        self._tlb_addr = None
+        self._tlb_page = None
+        self._tlb_owned = False
+
+    def _get_page(self, page_address: int):
+        if page_address == self._tlb_addr:
+            return self._tlb_page
+
         assert page_address in self.pages
+        page = self.pages[page_address]
+        self._tlb_addr = page_address
+        self._tlb_page = page
+        self._tlb_owned = self.pages.is_owned(page_address)
+        return page
+
+    def _set_page(self, page_address: int, page: Page):
+        self.pages[page_address] = page
+        self._tlb_addr = page_address
+        self._tlb_page = page
+        self._tlb_owned = True
+
+    def _own_page(self, page_address: int):
+        # returns the page, copying it first if shared with other memories
+        page = self._get_page(page_address)
+        if not self._tlb_owned:
+            page = page.clone()
+            self._set_page(page_address, page)
+        return page
+
+    def _store(self, page_address: int, page_index: BV, value: BV, condition: Bool = None):
         assert value.size == 8
 
-        value = value.simplify()
-        self.pages[page_address] = self.pages[page_address].store(
-            page_index, value, condition)
+        self._own_page(page_address).store(page_index, value, condition)
+
+    def _split_address(self, address: int):
+        # integer counterpart of split_bv, for concrete addresses
+        address &= self._address_mask
+        return address >> self.index_bits, \
+            BVV(address & (self.page_size - 1), self.index_bits)
+
+    def _word_page(self, address: int, size: int):
+        # returns (page_address, page_index) if the access of "size" bytes
+        # at the concrete address does not cross a page boundary
+        page_address, page_index = self._split_address(address)
+        end_page_address = ((address + size - 1) & self._address_mask) >> self.index_bits
+        if page_address != end_page_address:
+            return None, None
+        return page_address, page_index
 
     def store(self, address, value: BV, endness='big'):
         if isinstance(address, int):
@@ -273,9 +480,42 @@ class Memory(MemoryAbstract):
         address, min_addr, max_addr = self._handle_symbolic_address(
             address, value.size, "store")
 
-        conditions = list()
         size = value.size
         assert size % 8 == 0
+
+        # simplify the value once, not every extracted byte
+        value = value.simplify()
+
+        if not symbolic(address):
+            # concrete address: page and index are computed with integer math
+            address = address.value
+            num_bytes = size // 8
+            page_address, page_index = self._word_page(address, num_bytes)
+            if page_address is not None:
+                # fast path: concrete access within one page
+                if page_address != self._tlb_addr and page_address not in self.pages:
+                    self.state.executor.put_in_errored(
+                        self.state, "write unmapped"
+                    )
+                    raise exceptions.UnmappedWrite(self.state.get_ip())
+                self._own_page(page_address).store_word(
+                    page_index, value, endness)
+                return
+
+            for i in range(num_bytes - 1, -1, -1):
+                offset = i if endness == 'little' else num_bytes - i - 1
+                page_address, page_index = self._split_address(address + offset)
+                if page_address != self._tlb_addr and page_address not in self.pages:
+                    self.state.executor.put_in_errored(
+                        self.state, "write unmapped"
+                    )
+                    raise exceptions.UnmappedWrite(self.state.get_ip())
+                self._store(page_address, page_index,
+                            value.Extract(8*(i+1)-1, 8*i))
+            return
+
+        # page constraints of the symbolic bytes, asserted once after the loop
+        page_constraints = list()
         for i in range(size // 8 - 1, -1, -1):
             if endness == 'little':
                 page_address, page_index = split_bv(
@@ -289,7 +529,7 @@ class Memory(MemoryAbstract):
                 if symbolic(page_address):
                     page_address = self.state.solver.evaluate(page_address)
                 page_address = page_address.value
-                if page_address not in self.pages:
+                if page_address != self._tlb_addr and page_address not in self.pages:
                     self.state.executor.put_in_errored(
                         self.state, "write unmapped"
                     )
@@ -298,39 +538,38 @@ class Memory(MemoryAbstract):
                             value.Extract(8*(i+1)-1, 8*i))
             else:  # symbolic access
                 conditions = list()
-                for p in self.pages:  # can be improved?
-                    at_least_one_page = False
-                    if p < (min_addr >> self.index_bits) or p > (max_addr >> self.index_bits):
-                        continue
-                    if self.state.solver.satisfiable(extra_constraints=[
-                        page_address == p
-                    ]):
-                        at_least_one_page = True
-                        condition = p == page_address
-                        conditions.append(condition)
-                        self._store(p, page_index, value.Extract(
-                            8*(i+1)-1, 8*i), condition)
-                if not at_least_one_page:
+                feasible_pages = self._feasible_pages(
+                    page_address, min_addr, max_addr)
+                if not feasible_pages:
                     self.state.executor.put_in_errored(
                         self.state, "write unmapped"
                     )
                     raise exceptions.UnmappedWrite(self.state.get_ip())
-            if conditions:
-                check_unmapped = self.state.executor.bncache.get_setting(
-                    "memory.check_unmapped") == 'true'
-                if check_unmapped and self.state.solver.satisfiable(extra_constraints=[
-                    Or(*conditions).Not()
-                ]):
-                    errored_state = self.state.copy()
-                    errored_state.solver.add_constraints(Or(*conditions).Not())
-                    self.state.executor.put_in_errored(
-                        errored_state, "write unmapped"
-                    )
-                self.state.solver.add_constraints(Or(*conditions))
+                for p in feasible_pages:
+                    condition = p == page_address
+                    conditions.append(condition)
+                    self._store(p, page_index, value.Extract(
+                        8*(i+1)-1, 8*i), condition)
+                page_constraint = Or(*conditions).simplify()
+                if not any(page_constraint.eq(c) for c in page_constraints):
+                    page_constraints.append(page_constraint)
+
+        if page_constraints:
+            page_constraint = And(*page_constraints)
+            check_unmapped = self.state.executor.bncache.get_setting(
+                "memory.check_unmapped") == 'true'
+            if check_unmapped and self.state.solver.satisfiable(extra_constraints=[
+                page_constraint.Not()
+            ]):
+                errored_state = self.state.copy()
+                errored_state.solver.add_constraints(page_constraint.Not())
+                self.state.executor.put_in_errored(
+                    errored_state, "write unmapped"
+                )
+            self.state.solver.add_constraints(page_constraint)
 
     def _load(self, page_address: int, page_index: BV):
-        assert page_address in self.pages
-        return self.pages[page_address].load(page_index)
+        return self._get_page(page_address).load(page_index)
 
     def load(self, address, size: int, endness='big'):
         if isinstance(address, int):
@@ -343,8 +582,37 @@ class Memory(MemoryAbstract):
         address, min_addr, max_addr = self._handle_symbolic_address(
             address, size, "load")
 
+        if not symbolic(address):
+            # concrete address: page and index are computed with integer math
+            address = address.value
+            page_address, page_index = self._word_page(address, size)
+            if page_address is not None:
+                # fast path: concrete access within one page
+                if page_address != self._tlb_addr and page_address not in self.pages:
+                    self.state.executor.put_in_errored(
+                        self.state, "read unmapped"
+                    )
+                    raise exceptions.UnmappedRead(self.state.get_ip())
+                res = self._get_page(page_address).load_word(
+                    page_index, size, endness)
+                return res.simplify()
+
+            res = None
+            ran = range(size - 1, -1, -1) if endness == 'little' else range(size)
+            for i in ran:
+                page_address, page_index = self._split_address(address + i)
+                if page_address != self._tlb_addr and page_address not in self.pages:
+                    self.state.executor.put_in_errored(
+                        self.state, "read unmapped"
+                    )
+                    raise exceptions.UnmappedRead(self.state.get_ip())
+                tmp = self._load(page_address, page_index)
+                res = tmp if res is None else res.Concat(tmp)
+            return res.simplify()
+
         res = None
-        conditions = list()
+        # page constraints of the symbolic bytes, asserted once after the loop
+        page_constraints = list()
         ran = range(size - 1, -1, -1) if endness == 'little' else range(size)
         for i in ran:
             page_address, page_index = split_bv(address + i, self.index_bits)
@@ -353,7 +621,7 @@ class Memory(MemoryAbstract):
                 if symbolic(page_address):
                     page_address = self.state.solver.evaluate(page_address)
                 page_address = page_address.value
-                if page_address not in self.pages:
+                if page_address != self._tlb_addr and page_address not in self.pages:
                     self.state.executor.put_in_errored(
                         self.state, "read unmapped"
                     )
@@ -361,39 +629,41 @@ class Memory(MemoryAbstract):
                 tmp = self._load(page_address, page_index)
             else:  # symbolic access
                 conditions = list()
-                tmp = None
-                for p in self.pages:  # can be improved?
-                    if p < (min_addr >> self.index_bits) or p > (max_addr >> self.index_bits):
-                        continue
-                    if self.state.solver.satisfiable(extra_constraints=[
-                        page_address == p
-                    ]):
-                        condition = p == page_address
-                        conditions.append(condition)
-                        tmp = ITE(condition,
-                                  self._load(p, page_index),
-                                  tmp
-                                  ) if tmp is not None else self._load(p, page_index)
-
-                if tmp is None:
+                branches = list()
+                for p in self._feasible_pages(page_address, min_addr, max_addr):
+                    condition = p == page_address
+                    conditions.append(condition)
+                    branches.append((condition, self._load(p, page_index)))
+
+                if not branches:
                     self.state.executor.put_in_errored(
                         self.state, "read unmapped"
                     )
                     raise exceptions.UnmappedRead(self.state.get_ip())
+
+                # build the ITE chain bottom-up. The last page is the
+                # fallback: the disjunction of the conditions is asserted below
+                tmp = branches[-1][1]
+                for condition, value in reversed(branches[:-1]):
+                    tmp = ITE(condition, value, tmp)
+                page_constraint = Or(*conditions).simplify()
+                if not any(page_constraint.eq(c) for c in page_constraints):
+                    page_constraints.append(page_constraint)
             res = tmp if res is None else res.Concat(tmp)
 
-        if conditions:
+        if page_constraints:
+            page_constraint = And(*page_constraints)
             check_unmapped = self.state.executor.bncache.get_setting(
                 "memory.check_unmapped") == 'true'
             if check_unmapped and self.state.solver.satisfiable(extra_constraints=[
-                Or(*conditions).Not()
+                page_constraint.Not()
             ]):
                 errored_state = self.state.copy()
-                errored_state.solver.add_constraints(Or(*conditions).Not())
+                errored_state.solver.add_constraints(page_constraint.Not())
                 self.state.executor.put_in_errored(
                     errored_state, "read unmapped"
                 )
-            self.state.solver.add_constraints(Or(*conditions))
+            self.state.solver.add_constraints(page_constraint)
 
         assert res is not None
         assert res.size // 8 == size
@@ -401,46 +671,61 @@ class Memory(MemoryAbstract):
         return res.simplify()
 
     def get_unmapped(self, size: int, start_from: int = None, from_end: int = True):
+        # walk the gaps between mapped pages, instead of probing every
+        # page of the address space
         start_from = start_from >> self.index_bits if start_from is not None else None
         last_page = 2**(self.bits - self.index_bits) - 4
         first_page = 2
 
         if from_end:
-            res = last_page if start_from is None else start_from
-            count = 0
-
-            while res >= first_page:
-                if res not in self.pages:
-                    count += 1
-                    if count == size:
-                        return res
-                else:
-                    count = 0
-                res -= 1
+            high = last_page if start_from is None else start_from
+            i = bisect_right(self._page_addrs, high)
+            while high >= first_page:
+                # the gap goes from the first mapped page below high (excluded) to high
+                low = self._page_addrs[i - 1] if i > 0 else first_page - 1
+                low = max(low, first_page - 1)
+                if high - low >= size:
+                    return high - size + 1
+                high = low - 1
+                i -= 1
 
             return -1
 
         else:
-            idx = first_page if start_from is None else start_from
-            res = first_page if start_from is None else start_from
-            count = 0
-
-            while idx <= last_page:
-                if idx not in self.pages:
-                    count += 1
-                    if count == size:
-                        return res
-                else:
-                    count = 0
-                    idx += count+1
-                    res = idx
+            low = first_page if start_from is None else start_from
+            i = bisect_left(self._page_addrs, low)
+            while low <= last_page:
+                # the gap goes from low to the first mapped page above low (excluded)
+                high = self._page_addrs[i] if i < len(self._page_addrs) else last_page + 1
+                high = min(high, last_page + 1)
+                if high - low >= size:
+                    return low
+                low = high + 1
+                i += 1
 
             return -1
 
+    def _propose_allocation(self, size: int):
+        # allocations are placed top-down, so the pages right below the
+        # previous one are likely free. Check them with a single range query.
+        # The proposal is what get_unmapped would return only if the
+        # allocation does not fit in a gap above the hint
+        if self._alloc_hint is None or size < self._alloc_max_gap:
+            return -1
+        page_addr = self._alloc_hint - size + 1
+        if page_addr < 2 or self._mapped_pages_in_range(page_addr, self._alloc_hint):
+            return -1
+        return page_addr
+
     def allocate(self, size: int, init: InitData = None):
         assert size > 0
         num_pages = (size + self.page_size - 1) >> self.index_bits
-        page_addr = self.get_unmapped(num_pages)
+        page_addr = self._propose_allocation(num_pages)
+        if page_addr == -1:
+            page_addr = self.get_unmapped(num_pages)
+            # the gap walk skipped only the gaps smaller than num_pages
+            self._alloc_max_gap = num_pages
+        self._alloc_hint = page_addr - 1
         full_addr = page_addr << self.index_bits
         self.mmap(full_addr, num_pages * self.page_size, init)
 
@@ -448,28 +733,46 @@ class Memory(MemoryAbstract):
 
     def copy(self, state):
         new_memory = Memory(state, self.page_size, self.bits)
-        new_pages = dict()
-        for page_addr in self.pages:
-            new_pages[page_addr] = self.pages[page_addr].copy()
-        new_memory.pages = new_pages
+
+        # the current pages become the shared parent of both memories
+        parent = self.pages
+        if parent.depth >= COW_MAX_DEPTH:
+            parent = parent.flatten()
+        self.pages = CoWPages(parent)
+        new_memory.pages = CoWPages(parent)
+
+        new_memory._page_addrs = self._page_addrs
+        self._page_addrs_shared = True
+        new_memory._page_addrs_shared = True
+        new_memory._alloc_hint = self._alloc_hint
+        new_memory._alloc_max_gap = self._alloc_max_gap
+        self._invalidate_tlb()
         return new_memory
 
     def merge(self, other, merge_condition: Bool):
         assert isinstance(other, Memory)
         for page_addr in other.pages:
             other_page = other.pages[page_addr]
+            if page_addr in self.pages:
+                self_page = self.pages[page_addr]
+                if self_page is other_page:
+                    continue  # shared since the fork, never written by either
+                if (
+                    self_page._init is other_page._init and
+                    (self_page._init is None or
+                     not (self_page._written or other_page._written)) and
+                    self_page.mo.bvarray.z3obj.eq(other_page.mo.bvarray.z3obj)
+                ):
+                    # very same page. No need to update. The init bytes
+                    # are compared by identity, without moving them in mo
+                    continue
+            else:
+                self.mmap(page_addr << self.index_bits, self.page_size)
 
-            if (
-                page_addr in self.pages and
-                self.pages[page_addr].mo.bvarray.z3obj.eq(
-                    other_page.mo.bvarray.z3obj)
-            ):
-                continue  # very same page. No need to update
-
-            if page_addr not in self.pages:
-                self.mmap(page_addr, self.page_size)
-
-            self.pages[page_addr].mo.merge(
+            other_page.lazy_init()
+            page = self._own_page(page_addr)
+            page.lazy_init()
+            page.mo.merge(
                 other_page.mo,
                 merge_condition
             )
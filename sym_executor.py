@@ -58,6 +58,7 @@ class SymbolicExecutor(object):
         self._last_error = None
         self.init_with_zero = self.bncache.get_setting(
             "init_reg_mem_with_zero") == "true"
+        self.reload_settings()
 
         self._wasjmp = False
 
@@ -110,8 +111,8 @@ class SymbolicExecutor(object):
         self.state.initialize_stack(stack_base)
 
         # initialize registers
-        for reg in self.arch.regs_data():
-            reg_dict = self.arch.regs_data()[reg]
+        regs_data = self.arch.regs_data()
+        for reg, reg_dict in regs_data.items():
             val = current_function.get_reg_value_after(addr, reg)
 
             if val.type.value == RegisterValueType.StackFrameOffset:
@@ -181,15 +182,25 @@ class SymbolicExecutor(object):
     def __repr__(self):
         return self.__str__()
 
+    def reload_settings(self):
+        # settings read in the hot path of the execution
+        self.save_state_history = self.bncache.get_setting(
+            "save_state_history") == 'true'
+        self.dont_use_special_handlers = self.bncache.get_setting(
+            "dont_use_special_handlers") == 'true'
+        self.single_llil_step = self.bncache.get_setting(
+            "single_llil_step") == 'true'
+        self.save_unsat = self.bncache.get_setting("save_unsat") == 'true'
+
     def put_in_deferred(self, state):
+        state._cached_merge_dest = None
         self.fringe.add_deferred(state)
 
     def put_in_exited(self, state):
         self.fringe.add_exited(state)
 
     def put_in_unsat(self, state):
-        save_unsat = self.bncache.get_setting("save_unsat") == 'true'
-        if save_unsat:
+        if self.save_unsat:
             self.fringe.add_unsat(state)
 
     def put_in_errored(self, state, msg: str):
@@ -234,6 +245,19 @@ class SymbolicExecutor(object):
     def reset(self):
         self.set_colors(reset=True)
 
+    def _get_merge_dest(self, state, expr):
+        # destination of expr in state, computed once while the state
+        # does not move. Cached along with the instruction it belongs to
+        key = (expr.address, expr.instr_index)
+        if state._cached_merge_dest is None or state._cached_merge_dest[0] != key:
+            curr_state = self.state
+            self.state = state
+            try:
+                state._cached_merge_dest = (key, self.visitor.visit(expr.dest))
+            finally:
+                self.state = curr_state
+        return state._cached_merge_dest[1]
+
     def extract_mergeable_with_current_state(self, to_merge):
         # returns the set of states that do not deviate from
         # the current state after executing the current instruction
@@ -247,19 +271,15 @@ class SymbolicExecutor(object):
                 # I do not want to call the solver... Just return them all
                 return to_merge, list()
 
-            curr_state = self.state
-
             mergeable = list()
             not_mergeable = list()
             for s in to_merge:
-                self.state = s
-                s_dst = self.visitor.visit(expr.dest)
+                s_dst = self._get_merge_dest(s, expr)
                 if symbolic(s_dst) or s_dst.value == curr_state_dst.value:
                     mergeable.append(s)
                 else:
                     not_mergeable.append(s)
 
-            self.state = curr_state
             return mergeable, not_mergeable
 
         return to_merge, list()
@@ -294,7 +314,7 @@ class SymbolicExecutor(object):
         self.state.llil_ip = new_llil_ip
 
     def _update_state_history(self, state, addr):
-        if self.bncache.get_setting("save_state_history") == 'true':
+        if self.save_state_history:
             state.insn_history.add(addr)
 
     def _execute_one(self):
@@ -338,14 +358,12 @@ class SymbolicExecutor(object):
         else:
             # check if a special handler is defined
 
-            dont_use_special_handlers = \
-                self.bncache.get_setting("dont_use_special_handlers") == 'true'
             disasm_str = self.bncache.get_disasm(self.ip)
             old_ip = self.ip
 
             try:
                 if (
-                    dont_use_special_handlers or
+                    self.dont_use_special_handlers or
                     not self.arch.execute_special_handler(disasm_str, self)
                 ):
                     expr = self.bncache.get_llil(func_name, self.llil_ip)
@@ -394,9 +412,7 @@ class SymbolicExecutor(object):
 
         res = None
         try:
-            single_llil_step = self.bncache.get_setting(
-                "single_llil_step") == 'true'
-            if single_llil_step:
+            if self.single_llil_step:
                 res = self._execute_one()
             else:
                 old_ip = self.ip
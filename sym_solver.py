@@ -7,6 +7,7 @@ from .expr import BV, BVV, Bool, And, Or, BoolExpr
 
 USE_OPT_SOLVER = False
 DBG            = False
+UNSAT_CACHE_SIZE = 1024
 
 class Solver(object):
     def __init__(self, state):
@@ -18,6 +19,10 @@ class Solver(object):
         self._max_cache = OrderedDict()
         self._eval_cache = OrderedDict()
         self._symb_check_cache = OrderedDict()
+        self._sat_cache = OrderedDict()
+        # unsat queries stay unsat when constraints are added, so this cache
+        # survives add_constraints (but not merge)
+        self._unsat_cache = OrderedDict()
 
         if DBG:
             self.dbg_idx = 0
@@ -34,6 +39,15 @@ class Solver(object):
         self._max_cache = OrderedDict()
         self._eval_cache = OrderedDict()
         self._symb_check_cache = OrderedDict()
+        self._sat_cache = OrderedDict()
+
+    def reset_z3_solver(self):
+        # drop the constraints from the z3 solver (used for the states saved
+        # as unsat). The cached results were computed with those constraints
+        self._solver = z3.Optimize() if USE_OPT_SOLVER else z3.Solver()
+        self._added_mem_constraints = set()
+        self._invalidate_cache()
+        self._unsat_cache = OrderedDict()
 
     def _rejuvenate(self):
         self._solver = z3.Optimize() if USE_OPT_SOLVER else z3.Solver()
@@ -104,22 +118,42 @@ class Solver(object):
             if not z3.BoolVal(True).eq(cz3):
                 self._solver.add(cz3)
 
-    def satisfiable(self, extra_constraints: list = None):
-        if extra_constraints:
-            self._add_memory_constraints(*extra_constraints)
-            self._solver.push()
-            self._add_tmp_constraints(*extra_constraints)
-
+    def _check(self):
         if DBG:
             fout = open("/dev/shm/seninja_q_%d" % self.dbg_idx, "w")
             self.dbg_idx += 1
             fout.write(self._solver.sexpr())
             fout.close()
 
-        res = self._solver.check().r == 1
+        return self._solver.check().r == 1
+
+    def satisfiable(self, extra_constraints: list = None):
+        if extra_constraints:
+            self._add_memory_constraints(*extra_constraints)
+
+        # the cached z3 objects are kept alive to prevent their ids from being reused
+        z3objs = [c.z3obj for c in extra_constraints] if extra_constraints else []
+        key = frozenset(c.get_id() for c in z3objs)
+        if key in self._unsat_cache:
+            return False
+        if key in self._sat_cache:
+            return True
+
+        if extra_constraints:
+            self._solver.push()
+            self._add_tmp_constraints(*extra_constraints)
+
+        res = self._check()
 
         if extra_constraints:
             self._solver.pop()
+
+        if res:
+            self._sat_cache[key] = z3objs
+        else:
+            self._unsat_cache[key] = z3objs
+            if len(self._unsat_cache) > UNSAT_CACHE_SIZE:
+                self._unsat_cache.popitem(last=False)
         return res
 
     def evaluate(self, var, extra_constraints: list = None) -> int:
@@ -131,7 +165,7 @@ class Solver(object):
             return self._eval_cache[var]
 
         self._add_memory_constraints(var)
-        if not self.satisfiable():
+        if not self._check():
             if extra_constraints:
                 self._solver.pop()
             assert False  # not satisfiable!
@@ -146,19 +180,19 @@ class Solver(object):
         return res
 
     def evaluate_upto(self, var, n, extra_constraints: list = None) -> list:
-        self._solver.push()
+        # the memory constraints must be added outside the temporary frame
         if extra_constraints:
             self._add_memory_constraints(*extra_constraints)
-            self._add_tmp_constraints(*extra_constraints)
-
         self._add_memory_constraints(var)
-        if not self.satisfiable():
-            if extra_constraints:
-                self._solver.pop()
-            assert False  # not satisfiable!
+
+        # enumerate the models incrementally in a single frame, blocking
+        # the values already found
+        self._solver.push()
+        if extra_constraints:
+            self._add_tmp_constraints(*extra_constraints)
 
         res = list()
-        while n > 0 and self.satisfiable():
+        while n > 0 and self._check():
             model = self._solver.model()
             r = model.evaluate(var.z3obj, model_completion=True)
             r = BVV(r.as_long(), var.size)
@@ -167,6 +201,7 @@ class Solver(object):
             n -= 1
 
         self._solver.pop()
+        assert res  # not satisfiable!
         return res
 
     def symbolic(self, val: BV):
@@ -266,7 +301,7 @@ class Solver(object):
             self._solver.push()
             self._add_tmp_constraints(*extra_constraints)
 
-        assert self.satisfiable()
+        assert self._check()
         res = self._solver.model()
         if extra_constraints:
             self._solver.pop()
@@ -297,6 +332,18 @@ class Solver(object):
                 break
             new._symb_check_cache[key] = self._symb_check_cache[key]
             i += 1
+        i = 0
+        for key in reversed(self._sat_cache.keys()):
+            if i > max_num_elem:
+                break
+            new._sat_cache[key] = self._sat_cache[key]
+            i += 1
+        i = 0
+        for key in reversed(self._unsat_cache.keys()):
+            if i > max_num_elem:
+                break
+            new._unsat_cache[key] = self._unsat_cache[key]
+            i += 1
 
     def copy(self, state, fast_copy=False):
         fast_copy = True  # deepcopy seems broken
@@ -339,6 +386,7 @@ class Solver(object):
         common, only_self, only_other = self.compute_solvers_difference(other)
 
         self._invalidate_cache()
+        self._unsat_cache = OrderedDict()
 
         new_z3_solver = z3.Solver()
         self.assertions = []
@@ -24,6 +24,9 @@ class State(object):
         self.symbolic_buffers = list()
         self._ipreg = self.arch.getip_reg()
         self._bits = self.arch.bits()
+        # ((address, instr_index), destination) of the current instruction,
+        # used when merging
+        self._cached_merge_dest = None
 
     def __str__(self):
         return "<SymState 0x{id:x} @ 0x{addr:0{width}X}>".format(
@@ -68,6 +71,7 @@ class State(object):
         if not symbolic(ip):
             self.executor._update_state_history(self, ip.value)
         setattr(self.regs, self._ipreg, BVV(new_ip, self._bits))
+        self._cached_merge_dest = None
 
     def copy(self, solver_copy_fast=False):
         new_state = State(self.executor, self.os.copy(),
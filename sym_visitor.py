@@ -665,7 +665,7 @@ class SymbolicVisitor(BNILVisitor):
         true_llil_index = expr.true
         false_llil_index = expr.false
 
-        save_unsat = self.executor.bncache.get_setting("save_unsat") == 'true'
+        save_unsat = self.executor.save_unsat
 
         true_sat = True
         false_sat = True
@@ -711,7 +711,7 @@ class SymbolicVisitor(BNILVisitor):
 
             if save_unsat:
                 false_state.solver.add_constraints(condition.Not())
-                import z3; false_state.solver._solver = z3.Solver()
+                false_state.solver.reset_z3_solver()
 
                 false_state.set_ip(self.executor.bncache.get_address(
                     curr_fun_name, false_llil_index))
@@ -727,7 +727,7 @@ class SymbolicVisitor(BNILVisitor):
 
             if save_unsat:
                 true_state.solver.add_constraints(condition)
-                import z3; true_state.solver._solver = z3.Solver()
+                true_state.solver.reset_z3_solver()
 
                 true_state.set_ip(self.executor.bncache.get_address(
                     curr_fun_name, true_llil_index))
@@ -739,7 +739,7 @@ class SymbolicVisitor(BNILVisitor):
 
             if save_unsat:
                 true_state.solver.add_constraints(condition)
-                import z3; true_state.solver._solver = z3.Solver()
+                true_state.solver.reset_z3_solver()
 
                 true_state.set_ip(self.executor.bncache.get_address(
                     curr_fun_name, true_llil_index))
@@ -747,7 +747,7 @@ class SymbolicVisitor(BNILVisitor):
                 self.executor.put_in_unsat(true_state)
 
                 false_state.solver.add_constraints(condition.Not())
-                import z3; false_state.solver._solver = z3.Solver()
+                false_state.solver.reset_z3_solver()
 
                 false_state.set_ip(self.executor.bncache.get_address(
                     curr_fun_name, false_llil_index))
@@ -2,6 +2,7 @@ from . import file_tests
 from . import os_linux_tests
 from . import os_windows_tests
 from . import memory_tests
+from . import solver_tests
 
 
 def handle_test(module, test):
@@ -26,3 +27,4 @@ def run():
     handle_module("file tests", file_tests)
     handle_module("os linux tests", os_linux_tests)
     handle_module("os windows tests", os_windows_tests)
+    handle_module("solver tests", solver_tests)
@@ -1,5 +1,26 @@
-from ..expr import BVV
+from ..expr import BVV, BoolS
 from ..memory.sym_flat_memory_not_paged import MemoryConcreteFlatNotPaged
+from ..memory.sym_memory import Memory, InitData, COW_MAX_DEPTH
+
+
+class DummyArch(object):
+    def bits(self):
+        return 64
+
+
+class DummyExecutor(object):
+    def put_in_errored(self, state, msg):
+        pass
+
+
+class DummyState(object):
+    # what Memory needs from a state on concrete accesses
+    def __init__(self):
+        self.arch = DummyArch()
+        self.executor = DummyExecutor()
+
+    def get_ip(self):
+        return 0
 
 
 def test_1():
@@ -26,3 +47,121 @@ def test_1():
     assert r21.value == 0xff
     assert isinstance(r22, BVV)
     assert r22.value == 0xfa
+
+
+def test_2():  # get_unmapped from the end
+    m = Memory(DummyState())
+    last_page = 2**(64 - m.index_bits) - 4
+    m.mmap((last_page - 1) << m.index_bits, m.page_size)
+
+    assert m.get_unmapped(1) == last_page
+    assert m.get_unmapped(2) == last_page - 3
+    assert m.get_unmapped(
+        2, start_from=(last_page - 2) << m.index_bits) == last_page - 3
+
+
+def test_3():  # get_unmapped from the start, the whole range must be free
+    m = Memory(DummyState())
+    m.mmap(0x3000, 0x1000)
+    m.mmap(0x6000, 0x1000)
+
+    assert m.get_unmapped(1, from_end=False) == 2
+    assert m.get_unmapped(2, from_end=False) == 4
+    assert m.get_unmapped(3, from_end=False) == 7
+    assert m.get_unmapped(1, start_from=0x6000, from_end=False) == 7
+
+
+def test_4():  # init bytes after partial overwrites and cross-page words
+    m = Memory(DummyState())
+    m.mmap(0x400000, 0x2000, InitData(bytes(range(256)) * 32, 0))
+
+    m.store(BVV(0x400010, 64), BVV(0xaabb, 16))
+    assert m.load(BVV(0x40000f, 64), 4).value == 0x0faabb12
+
+    m.store(BVV(0x400ffe, 64), BVV(0x11223344, 32), endness='little')
+    assert m.load(BVV(0x400ffe, 64), 4, endness='little').value == 0x11223344
+    assert m.load(BVV(0x400ffc, 64), 8).value == 0xfcfd443322110203
+
+    # the concrete stores do not move the init bytes in the memory object
+    assert m.pages[0x400]._init is not None
+    assert m.pages[0x401]._init is not None
+
+
+def test_5():  # merge keeps the untouched init pages lazy
+    s = DummyState()
+    m = Memory(s)
+    m.mmap(0x400000, 0x4000, InitData(bytes(range(256)) * 64, 0))
+
+    m1 = m.copy(s)
+    m2 = m.copy(s)
+    m2.store(BVV(0x401000, 64), BVV(0xff, 8))
+    m1.merge(m2, BoolS("c"))
+
+    for page_addr in (0x400, 0x402, 0x403):
+        assert m1.pages[page_addr]._init is not None
+    assert m1.load(BVV(0x402001, 64), 1).value == 0x01
+
+    r1 = m1.load(BVV(0x401000, 64), 1)
+    r2 = m1.load(BVV(0x401001, 64), 1)
+    assert not isinstance(r1, BVV)
+    assert isinstance(r2, BVV)
+    assert r2.value == 0x01
+
+    # the other memory is untouched
+    assert m2.load(BVV(0x401000, 64), 1).value == 0xff
+    assert m.load(BVV(0x401000, 64), 1).value == 0x00
+
+
+def test_6():  # stores of a fork are not visible to the parent and siblings
+    s = DummyState()
+    m = Memory(s)
+    m.mmap(0x400000, 0x1000)
+    m.store(BVV(0x400000, 64), BVV(0x01, 8))
+
+    m1 = m.copy(s)
+    m2 = m.copy(s)
+    m3 = m1.copy(s)
+    m1.store(BVV(0x400000, 64), BVV(0x02, 8))
+    m2.store(BVV(0x400000, 64), BVV(0x03, 8))
+    m3.mmap(0x500000, 0x1000)
+
+    assert m.load(BVV(0x400000, 64), 1).value == 0x01
+    assert m1.load(BVV(0x400000, 64), 1).value == 0x02
+    assert m2.load(BVV(0x400000, 64), 1).value == 0x03
+    assert m3.load(BVV(0x400000, 64), 1).value == 0x01
+
+    assert m3.is_mapped(0x500000)
+    assert not m.is_mapped(0x500000)
+    assert not m1.is_mapped(0x500000)
+
+
+def test_7():  # long chains of forks
+    s = DummyState()
+    m = Memory(s)
+    m.mmap(0x400000, 0x1000)
+
+    mems = [m]
+    for i in range(COW_MAX_DEPTH * 2):
+        m = m.copy(s)
+        m.store(BVV(0x400000 + i, 64), BVV(i + 1, 8))
+        mems.append(m)
+
+    for depth, m in enumerate(mems):
+        for i in range(COW_MAX_DEPTH * 2):
+            expected = i + 1 if i < depth else 0
+            assert m.load(BVV(0x400000 + i, 64), 1).value == expected
+
+
+def test_8():  # allocate fills the gaps above the previous allocations first
+    m = Memory(DummyState())
+    last_page = 2**(64 - m.index_bits) - 4
+    m.mmap((last_page - 2) << m.index_bits, m.page_size)
+
+    a1 = m.allocate(0x3000)
+    a2 = m.allocate(0x1000)
+    a3 = m.allocate(0x1000)
+    a4 = m.allocate(0x1000)
+    assert a1 == (last_page - 5) << m.index_bits
+    assert a2 == last_page << m.index_bits
+    assert a3 == (last_page - 1) << m.index_bits
+    assert a4 == (last_page - 6) << m.index_bits
@@ -0,0 +1,37 @@
+from ..expr import BVS
+from ..sym_solver import Solver
+
+
+def test_1():  # unsat queries stay unsat when constraints are added
+    s = Solver(None)
+    x = BVS("x", 32)
+    s.add_constraints(x == 1)
+    assert not s.satisfiable([x == 2])
+
+    s.add_constraints(x.ULT(10))
+    assert not s.satisfiable([x == 2])
+    assert s.satisfiable([x == 1])
+
+
+def test_2():  # sat queries are checked again when constraints are added
+    s = Solver(None)
+    x = BVS("x", 32)
+    assert s.satisfiable([x == 2])
+
+    s.add_constraints(x == 1)
+    assert not s.satisfiable([x == 2])
+
+
+def test_3():  # the cached results of a copy do not survive a solver reset
+    s = Solver(None)
+    x = BVS("x", 32)
+    s.add_constraints(x == 1)
+    assert not s.satisfiable([x == 2])
+
+    s1 = s.copy(None)
+    s1.add_constraints(x == 2)
+    s1.reset_z3_solver()
+    assert s1.satisfiable([x == 2])
+
+    # the original solver is untouched
+    assert not s.satisfiable([x == 2])
@@ -13,12 +13,10 @@ def split_bv_in_list(bv: BV, size: int) -> list:
     return res
 
 
-def bvv_from_bytes(val: bytes):  # DONT USE IT TO CREATE LONG BV!!
-    res = None
-    for c in val:
-        v = BVV(c, 8)
-        res = res.Concat(v) if res is not None else v
-    return res
+def bvv_from_bytes(val: bytes):
+    if not val:
+        return None
+    return BVV(int.from_bytes(val, 'big'), 8 * len(val))
 
 
 def split_bv(bv: BV, split_index: int):
@@ -33,14 +31,28 @@ def symbolic(val: BV) -> bool:
 
 
 def heuristic_find_base(val: BV):  # this can be brough inside BVExpr
+    # visit the DAG of the expression, each shared subexpression only once.
+    # Use the low-level API: no Python wrapper is built for interior nodes
     z3val = val.z3obj
-    fringe = z3val.children()
+    ctx = z3val.ctx_ref()
+    visited = set()
+    fringe = [z3val.as_ast()]
     while fringe:
         el = fringe.pop()
-        if (
-            not (z3.simplify(z3val).decl().kind() != z3.Z3_OP_BNUM) and
-            el.value > MIN_BASE
-        ):
-            return el.value
-        fringe.extend(el.children())
+        el_id = z3.Z3_get_ast_id(ctx, el)
+        if el_id in visited:
+            continue
+        visited.add(el_id)
+        kind = z3.Z3_get_ast_kind(ctx, el)
+        if kind == z3.Z3_NUMERAL_AST:
+            if z3.Z3_get_sort_kind(ctx, z3.Z3_get_sort(ctx, el)) == z3.Z3_BV_SORT:
+                num = int(z3.Z3_get_numeral_string(ctx, el))
+                if num > MIN_BASE:
+                    return num
+            continue
+        if kind != z3.Z3_APP_AST:
+            continue
+        app = z3.Z3_to_app(ctx, el)
+        for i in range(z3.Z3_get_app_num_args(ctx, app)):
+            fringe.append(z3.Z3_get_app_arg(ctx, app, i))
     return -1
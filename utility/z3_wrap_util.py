@@ -20,24 +20,26 @@ def split_bv_in_list(bv: z3.BitVecRef, size: int) -> list:
     return res
 
 
-def bvv_from_bytes(val: bytes):  # DONT USE IT TO CREATE LONG BV!!
-    res = None
-    for c in val:
-        v = z3.BitVecVal(c, 8)
-        res = z3.Concat(res, v) if res is not None else v
-    return res
+def bvv_from_bytes(val: bytes):
+    if not val:
+        return None
+    return z3.BitVecVal(int.from_bytes(val, 'big'), 8 * len(val))
 
 
 def split_bv(bv: z3.BitVecRef, split_index: int):
+    bv = z3.simplify(bv)
     return (
         # most significant
-        z3.simplify(z3.Extract(bv.size - 1, split_index, bv)),
-        z3.simplify(z3.Extract(split_index - 1, 0, bv)
-                    )         # least significant
+        z3.simplify(z3.Extract(bv.size() - 1, split_index, bv)),
+        # least significant
+        z3.simplify(z3.Extract(split_index - 1, 0, bv))
     )
 
 
 def symbolic(val: z3.BitVecRef) -> bool:
+    if val.decl().kind() == z3.Z3_OP_BNUM:
+        # already a value, no need to simplify
+        return False
     return z3.simplify(val).decl().kind() != z3.Z3_OP_BNUM
 
 
@@ -47,10 +49,28 @@ def bvv_to_long(val: z3.BitVecRef):
 
 
 def heuristic_find_base(val: z3.BitVecRef):
-    fringe = val.children()
+    # visit the DAG of the expression, each shared subexpression only once.
+    # Use the low-level API: no Python wrapper is built for interior nodes
+    z3val = val
+    ctx = z3val.ctx_ref()
+    visited = set()
+    fringe = [z3val.as_ast()]
     while fringe:
         el = fringe.pop()
-        if not symbolic(el) and el.value > MIN_BASE:
-            return el.value
-        fringe.extend(el.children())
+        el_id = z3.Z3_get_ast_id(ctx, el)
+        if el_id in visited:
+            continue
+        visited.add(el_id)
+        kind = z3.Z3_get_ast_kind(ctx, el)
+        if kind == z3.Z3_NUMERAL_AST:
+            if z3.Z3_get_sort_kind(ctx, z3.Z3_get_sort(ctx, el)) == z3.Z3_BV_SORT:
+                num = int(z3.Z3_get_numeral_string(ctx, el))
+                if num > MIN_BASE:
+                    return num
+            continue
+        if kind != z3.Z3_APP_AST:
+            continue
+        app = z3.Z3_to_app(ctx, el)
+        for i in range(z3.Z3_get_app_num_args(ctx, app)):
+            fringe.append(z3.Z3_get_app_arg(ctx, app, i))
     return -1